@@ -4,46 +4,121 @@ Wikipedia Page Converter
 Converts Wikipedia HTML content to our fake Wikipedia format.
 """
 
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+import html
 import sys
 from urllib.parse import urljoin
 from datetime import datetime
-import requests
-import base64
+import httpx
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import hashlib
+import json
+import os
 import re
+import threading
+try:
+    import pybase64 as base64  # SIMD-accelerated, drop-in replacement
+    b64encode_as_string = base64.b64encode_as_string
+except ImportError:
+    import base64
+
+    def b64encode_as_string(data):
+        return base64.b64encode(data).decode('ascii')
 import time
 
-def download_resource(url, retries=4, delay=2.0):
-    """Download a resource and return as base64 or None if failed.
-    delay: seconds to wait before making the request (rate limiting).
-    Retries with exponential backoff on 429 (Too Many Requests).
+# Number of resources downloaded in parallel in offline mode. Request starts are still
+# spaced out by the shared throttle below, so this only overlaps slow transfers.
+DOWNLOAD_WORKERS = 16
+
+# Shared rate limit across all download threads: the earliest time the next request may start
+throttle_lock = threading.Lock()
+next_request_time = 0.0
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+DOWNLOAD_HEADERS = {'User-Agent': USER_AGENT}
+
+# The article itself is requested with a full browser User-Agent
+PAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Shared HTTP/2 client so all requests reuse (and multiplex over) the same connections
+CLIENT = httpx.Client(
+    http2=True,
+    headers=DOWNLOAD_HEADERS,
+    timeout=10.0,
+    follow_redirects=True,
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=DOWNLOAD_WORKERS),
+)
+atexit.register(CLIENT.close)
+
+# Font URLs referenced from url(...) in stylesheets
+FONT_URL_RE = re.compile(r'url\(([\'"]?)([^\'")]+\.(?:woff2?|ttf|otf|eot)(?:[?#][^\'")]*)?)\1\)')
+
+# Compiled XPath selectors for the queries run on every page
+XPATH_HEAD_URLS = etree.XPath('.//link[@href] | .//script[@src]')
+XPATH_IMAGES = etree.XPath('.//img[@src]')
+XPATH_STYLESHEETS = etree.XPath(
+    ".//link[@href][not(starts-with(@href, 'data:'))]"  # Skip already embedded stylesheets
+    "[contains(concat(' ', normalize-space(@rel), ' '), ' stylesheet ')]"
+)
+XPATH_STYLES = etree.XPath('.//style[text()]')
+
+# Downloaded resources are kept here across runs, keyed by sha1 of the download kind and url
+CACHE_DIR = os.path.expanduser('~/.cache/wiki_converter')
+
+# Bytes read per streamed chunk; a multiple of 3 so base64 chunks concatenate cleanly
+STREAM_CHUNK_SIZE = 57 * 1024
+
+def wait_for_request_slot(delay):
+    """Block until this thread may start a request, keeping request starts
+    at least delay seconds apart across all download threads (rate limiting).
+    """
+    global next_request_time
+    with throttle_lock:
+        now = time.monotonic()
+        start = max(now, next_request_time)
+        next_request_time = start + delay
+    if start > now:
+        time.sleep(start - now)
+
+
+def postpone_requests(wait):
+    """Hold back every download thread for wait seconds (after a 429)."""
+    global next_request_time
+    with throttle_lock:
+        next_request_time = max(next_request_time, time.monotonic() + wait)
+
+
+def fetch_resource(url, retries=4, delay=2.0, stream=False):
+    """Fetch a resource and return the response or None if failed.
+    delay: minimum seconds between request starts, shared by all threads (rate limiting).
+    stream: defer downloading the body until it is iterated.
+    Retries with exponential backoff on 429 (Too Many Requests), pausing all threads.
     """
-    if delay > 0:
-        time.sleep(delay)
-
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    }
-
     for attempt in range(retries):
+        wait_for_request_slot(delay)
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = CLIENT.send(CLIENT.build_request('GET', url), stream=stream)
             if response.status_code == 429:
+                response.close()
                 wait = int(response.headers.get('Retry-After', 2 ** (attempt + 1)))
                 print(f"      Rate limited (429). Waiting {wait}s... (attempt {attempt+1}/{retries})")
-                time.sleep(wait)
+                postpone_requests(wait)
                 continue
+            if response.is_error:
+                response.close()
             response.raise_for_status()
-            return {
-                'data': base64.b64encode(response.content).decode('utf-8'),
-                'content_type': response.headers.get('content-type', 'application/octet-stream')
-            }
-        except requests.exceptions.Timeout:
+            return response
+        except httpx.TimeoutException:
             if attempt < retries - 1:
                 print(f"  Warning: Timeout downloading {url[:60]}... (retry {attempt+1}/{retries-1})")
             else:
                 print(f"  Warning: Could not download {url[:60]}... (timeout after {retries} attempts)")
-        except requests.exceptions.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             print(f"  Warning: Could not download {url[:60]}...: {e}")
             break
         except Exception as e:
@@ -52,250 +127,397 @@ def download_resource(url, retries=4, delay=2.0):
 
     return None
 
+def cache_path(kind, url):
+    return os.path.join(CACHE_DIR, hashlib.sha1(f"{kind}:{url}".encode('utf-8')).hexdigest())
+
+def read_cached_resource(kind, url):
+    """Return a previously downloaded resource from the on-disk cache or None."""
+    try:
+        with open(cache_path(kind, url), 'r', encoding='ascii') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_cached_resource(kind, url, resource):
+    """Store a downloaded resource in the on-disk cache, ignoring failures."""
+    path = cache_path(kind, url)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='ascii') as f:
+            json.dump(resource, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"  Warning: Could not cache {url[:60]}...: {e}")
+
+# Successful downloads for this process, keyed by (download function name, url)
+RESOURCE_CACHE = {}
+
+def cached(download):
+    """Cache successful results of download in memory and on disk across runs.
+    Failures (None) are not cached, so a transient error can be retried later.
+    """
+    kind = download.__name__
+
+    @functools.wraps(download)
+    def wrapper(url, retries=4, delay=2.0):
+        key = (kind, url)
+        if key in RESOURCE_CACHE:
+            return RESOURCE_CACHE[key]
+        resource = read_cached_resource(kind, url)
+        if resource is None:
+            resource = download(url, retries=retries, delay=delay)
+            if resource is None:
+                return None
+            write_cached_resource(kind, url, resource)
+        RESOURCE_CACHE[key] = resource
+        return resource
+
+    return wrapper
+
+@cached
+def download_resource(url, retries=4, delay=2.0):
+    """Download a binary resource (image, font) and return as base64 or None if failed.
+    The body is streamed and encoded chunk by chunk, so the raw bytes are never held in full.
+    """
+    response = fetch_resource(url, retries=retries, delay=delay, stream=True)
+    if response is None:
+        return None
+
+    encoded = []
+    pending = b''
+    try:
+        for chunk in response.iter_bytes(chunk_size=STREAM_CHUNK_SIZE):
+            # Only encode whole 3-byte groups; carry the rest into the next chunk
+            pending += chunk
+            aligned = len(pending) - len(pending) % 3
+            encoded.append(b64encode_as_string(pending[:aligned]))
+            pending = pending[aligned:]
+    except httpx.HTTPError as e:
+        print(f"  Warning: Could not download {url[:60]}...: {e}")
+        return None
+    finally:
+        response.close()
+    encoded.append(b64encode_as_string(pending))
+
+    return {
+        'data': ''.join(encoded),
+        'content_type': response.headers.get('content-type', 'application/octet-stream')
+    }
+
+@cached
+def download_text(url, retries=4, delay=2.0):
+    """Download a text resource (CSS) and return it decoded or None if failed."""
+    response = fetch_resource(url, retries=retries, delay=delay)
+    if response is None:
+        return None
+    return response.text
+
+def download_all(download, urls):
+    """Run download over all urls concurrently, returning results in the same order.
+    Duplicate urls are only downloaded once.
+    """
+    unique_urls = list(dict.fromkeys(urls))
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        results = dict(zip(unique_urls, executor.map(download, unique_urls)))
+    return [results[url] for url in urls]
+
+
 def embed_images_in_body(body):
     """Embed all images in body as base64 data URIs."""
     print("  Downloading and embedding images...")
     image_count = 0
 
-    for img in body.find_all('img'):
-        if 'src' in img.attrs:
-            src = img.attrs['src']
-            if src.startswith('data:'):
-                continue  # Skip already embedded images
-
-            print(f"    Image: {src[:60]}...")
-            resource = download_resource(src)
-            if resource:
-                media_type = resource['content_type'].split(';')[0]
-                img['src'] = f"data:{media_type};base64,{resource['data']}"
-                image_count += 1
-                print(f"      ✓ Embedded")
-            else:
-                print(f"      ✗ Failed")
+    # Collect first, download concurrently, then patch the tree single-threaded
+    images = []
+    for img in XPATH_IMAGES(body):
+        src = img.get('src')
+        if src.startswith('data:'):
+            continue  # Skip already embedded images
+        images.append((img, src))
+
+    resources = download_all(download_resource, [src for _, src in images])
+
+    for (img, src), resource in zip(images, resources):
+        print(f"    Image: {src[:60]}...")
+        if resource:
+            media_type = resource['content_type'].split(';')[0]
+            img.set('src', f"data:{media_type};base64,{resource['data']}")
+            image_count += 1
+            print(f"      ✓ Embedded")
+        else:
+            print(f"      ✗ Failed")
 
     print(f"  Successfully embedded {image_count} images")
 
 
-def embed_css_and_fonts_in_head(head, soup):
+def embed_css_and_fonts_in_head(head):
     """Embed CSS and fonts in head."""
     print("  Downloading and embedding stylesheets...")
 
     # Process stylesheets
-    for link in head.find_all('link', {'rel': 'stylesheet'}):
-        if 'href' in link.attrs:
-            href = link.attrs['href']
-            print(f"    CSS: {href[:60]}...")
-            resource = download_resource(href)
-            if resource:
-                style = soup.new_tag('style')
-                try:
-                    css_content = base64.b64decode(resource['data']).decode('utf-8')
-                    style.string = css_content
-                    link.replace_with(style)
-                    print(f"      ✓ Embedded")
-                except Exception as e:
-                    print(f"      ✗ Error: {e}")
+    links = XPATH_STYLESHEETS(head)
+    stylesheets = download_all(download_text, [link.get('href') for link in links])
+
+    for link, css_content in zip(links, stylesheets):
+        print(f"    CSS: {link.get('href')[:60]}...")
+        if css_content is not None:
+            style = lxml.html.Element('style')
+            style.text = css_content
+            style.tail = link.tail
+            link.getparent().replace(link, style)
+            print(f"      ✓ Embedded")
+        else:
+            print(f"      ✗ Failed")
 
     print("  Downloading and embedding fonts...")
     font_count = 0
 
-    # Process fonts in style tags
-    for style in head.find_all('style'):
-        if style.string:
-            css_content = style.string
-            font_urls = re.findall(r'url\([\'"]?([^\'")]+\.[wot]f[f2]?)[\'"]?\)', css_content)
-
-            for font_url in font_urls:
-                if not font_url.startswith('data:'):
-                    full_url = font_url
-                    if font_url.startswith('/'):
-                        full_url = f"https://en.wikipedia.org{font_url}"
-                    elif not font_url.startswith('http'):
-                        full_url = urljoin('https://en.wikipedia.org', font_url)
-
-                    print(f"    Font: {font_url[:60]}...")
-                    resource = download_resource(full_url)
-                    if resource:
-                        media_type = resource['content_type'].split(';')[0]
-                        data_uri = f"data:{media_type};base64,{resource['data']}"
-                        css_content = css_content.replace(f"url('{font_url}')", f"url('{data_uri}')")
-                        css_content = css_content.replace(f'url("{font_url}")', f'url("{data_uri}")')
-                        css_content = css_content.replace(f"url({font_url})", f"url({data_uri})")
-                        font_count += 1
-                        print(f"      ✓ Embedded")
-                    else:
-                        print(f"      ✗ Failed")
-
-            style.string = css_content
+    # Collect fonts referenced in style tags
+    styles = [style for style in XPATH_STYLES(head) if style.text]
+    font_urls = list(dict.fromkeys(
+        match.group(2)
+        for style in styles
+        for match in FONT_URL_RE.finditer(style.text)
+        if not match.group(2).startswith('data:')
+    ))
+
+    full_urls = [absolutize(font_url, 'https://en.wikipedia.org') for font_url in font_urls]
+
+    resources = download_all(download_resource, full_urls)
+
+    font_map = {}
+    for font_url, resource in zip(font_urls, resources):
+        print(f"    Font: {font_url[:60]}...")
+        if resource:
+            media_type = resource['content_type'].split(';')[0]
+            font_map[font_url] = f"data:{media_type};base64,{resource['data']}"
+            font_count += 1
+            print(f"      ✓ Embedded")
+        else:
+            print(f"      ✗ Failed")
+
+    # Swap every font URL for its data URI in a single pass per stylesheet
+    def embed_font(match):
+        quote, font_url = match.groups()
+        return f"url({quote}{font_map.get(font_url, font_url)}{quote})"
+
+    if font_map:
+        for style in styles:
+            style.text = FONT_URL_RE.sub(embed_font, style.text)
 
     print(f"  Successfully embedded {font_count} fonts")
 
 
+def absolutize(url, source_url):
+    """Make a relative URL absolute."""
+    if url.startswith('//'):
+        return 'https:' + url
+    elif not url.startswith('http'):
+        return urljoin(source_url, url)
+    return url
+
+
+def absolutize_attribute(element, attr, source_url):
+    """Make the URL in element's attr absolute, only writing it back if it changed."""
+    url = element.get(attr)
+    absolute = absolutize(url, source_url)
+    if absolute != url:
+        element.set(attr, absolute)
+
+
+def is_tracking_script(src, text):
+    """Check whether a script is a tracking/analytics script, by its src or inline content."""
+    src = src.lower()
+    text = (text or '').lower()
+    return ('analytics' in src or 'tracker' in src or 'google' in src
+            or 'analytics' in text or 'tracker' in text)
+
+
+def classes_of(element):
+    return element.get('class', '').split()
+
+
+def has_class_containing(element, needles):
+    """Check whether any class of element contains one of the given substrings."""
+    return any(needle in c for c in classes_of(element) for needle in needles)
+
+
+BOX_CLASSES = ['ambox', 'mbox', 'ombox', 'tmbox', 'cmbox', 'fmbox', 'imbox']
+
+# Divs we don't want: navigation boxes, site notices / campaign banners (e.g. "Wiki Loves Ramadan"),
+# old revision banner, hatnotes, maintenance boxes and the language selector
+REMOVED_DIV_CLASSES = {'navbox', 'printfooter', 'mw-authority-control', 'noprint', 'hatnote'}
+REMOVED_DIV_IDS = {'siteNotice', 'centralNotice', 'mw-siteNotice', 'contentSub', 'p-lang-btn'}
+REMOVED_DIV_CLASS_PARTS = ['siteNotice', 'centralNotice', 'mw-portlet-lang', 'after-portlet-lang'] + BOX_CLASSES
+
+# Edit links and their brackets
+REMOVED_SPAN_CLASSES = {'mw-editsection', 'mw-editsection-bracket'}
+
+
+# Body handlers return True when they removed (or replaced the contents of) the element,
+# so the walk does not descend into it
+
+def handle_noscript(element, source_url):
+    element.drop_tree()
+    return True
+
+
+def handle_script(script, source_url):
+    """Remove tracking/analytics scripts, keep all others but make URLs absolute."""
+    src = script.get('src', '')
+    if is_tracking_script(src, script.text):
+        script.drop_tree()
+        return True
+    elif src:
+        absolutize_attribute(script, 'src', source_url)
+    return False
+
+
+def handle_span(span, source_url):
+    if REMOVED_SPAN_CLASSES.intersection(classes_of(span)):
+        span.drop_tree()
+        return True
+    return False
+
+
+def handle_div(div, source_url):
+    classes = classes_of(div)
+    if (REMOVED_DIV_CLASSES.intersection(classes)
+            or div.get('id') in REMOVED_DIV_IDS
+            or div.get('role') in ('note', 'navigation')  # hatnotes, "See also" and other navigation boxes
+            or has_class_containing(div, REMOVED_DIV_CLASS_PARTS)):
+        div.drop_tree()
+        return True
+    elif 'mw-footer-container' in classes:
+        # Remove the footer container wrapper styling
+        div.set('style', 'background: none; border: none;')
+    return False
+
+
+def handle_table(table, source_url):
+    if has_class_containing(table, BOX_CLASSES):
+        table.drop_tree()
+        return True
+    return False
+
+
+def handle_button(button, source_url):
+    if has_class_containing(button, ['mw-interlanguage-selector']):
+        button.drop_tree()
+        return True
+    return False
+
+
+def handle_footer(footer, source_url):
+    """Replace the footer with a research notice."""
+    if footer.get('id') == 'footer':
+        footer.text = None
+        for child in list(footer):
+            footer.remove(child)
+        footer.set('style', 'text-align: center; padding: 20px; border-top: 1px solid #ccc; margin-top: 30px; color: #666; font-size: 13px;')
+        footer.extend(lxml.html.fragments_fromstring(
+            '<p>This article is created for research purposes only.</p>'
+            '<p>University of Konstanz</p>'
+        ))
+        return True
+    return False
+
+
+def handle_a(link, source_url):
+    """Disable all links except internal anchors — keep blue link styling."""
+    href = link.get('href')
+    if href is not None and not href.startswith('#'):
+        link.set('href', 'javascript:void(0)')
+    return False
+
+
+def handle_img(img, source_url):
+    if img.get('src') is not None:
+        absolutize_attribute(img, 'src', source_url)
+    return False
+
+
+BODY_HANDLERS = {
+    'noscript': handle_noscript,
+    'script': handle_script,
+    'span': handle_span,
+    'div': handle_div,
+    'table': handle_table,
+    'button': handle_button,
+    'footer': handle_footer,
+    'a': handle_a,
+    'img': handle_img,
+}
+
+
+def clean_body(parent, source_url):
+    """Clean up the tree below parent in a single walk, dispatching on tag name."""
+    # Materialize the children first since handlers mutate the tree
+    for element in list(parent):
+        handler = BODY_HANDLERS.get(element.tag)
+        if handler and handler(element, source_url):
+            continue
+        clean_body(element, source_url)
+
+
+def find_title(root):
+    """Find the article heading, preferring the firstHeading class, then id, then any h1."""
+    headings = list(root.iter('h1'))
+    for heading in headings:
+        if 'firstHeading' in classes_of(heading):
+            return heading
+    for heading in headings:
+        if heading.get('id') == 'firstHeading':
+            return heading
+    return headings[0] if headings else None
+
+
+def inner_html(element):
+    """Serialize the contents of element (without the element's own tag)."""
+    return html.escape(element.text or '', quote=False) + ''.join(
+        etree.tostring(child, encoding='unicode', method='html') for child in element
+    )
+
+
 def process_wikipedia_html(html_content, source_url, offline=False):
     """Process Wikipedia HTML and preserve original styling."""
 
-    soup = BeautifulSoup(html_content, 'html.parser')
+    root = lxml.html.document_fromstring(html_content)
 
     # Extract title
-    title = soup.find('h1', {'class': 'firstHeading'})
-    if not title:
-        title = soup.find('h1', {'id': 'firstHeading'})
-    if not title:
-        title = soup.find('h1')
-    title_text = title.get_text().strip() if title else "Wikipedia Article"
+    title = find_title(root)
+    title_text = title.text_content().strip() if title is not None else "Wikipedia Article"
 
     # Extract and process the head
-    head = soup.find('head')
+    head = root.find('head')
     head_content = ""
-    if head:
-        # Process stylesheets to make URLs absolute
-        for link in head.find_all('link', {'rel': 'stylesheet'}):
-            if 'href' in link.attrs:
-                href = link.attrs['href']
-                # Make relative URLs absolute
-                if href.startswith('/'):
-                    href = f"https://en.wikipedia.org{href}"
-                elif not href.startswith('http'):
-                    href = urljoin(source_url, href)
-                link['href'] = href
-
-        # Process other links (icons, etc.)
-        for link in head.find_all('link'):
-            if 'href' in link.attrs:
-                href = link.attrs['href']
-                if href.startswith('/'):
-                    href = f"https://en.wikipedia.org{href}"
-                elif not href.startswith('http'):
-                    href = urljoin(source_url, href)
-                link['href'] = href
-
-        # Process scripts in head - make URLs absolute but keep them all
-        for script in head.find_all('script'):
-            if 'src' in script.attrs:
-                src = script.attrs['src']
-                # Make relative URLs absolute
-                if src.startswith('/'):
-                    src = f"https://en.wikipedia.org{src}"
-                elif not src.startswith('http'):
-                    src = urljoin(source_url, src)
-                script['src'] = src
-
-        head_content = str(head)
+    if head is not None:
+        # Make stylesheet/icon links and script URLs absolute but keep them all
+        for element in XPATH_HEAD_URLS(head):
+            absolutize_attribute(element, 'href' if element.tag == 'link' else 'src', source_url)
+
+        head_content = etree.tostring(head, encoding='unicode', method='html', with_tail=False)
 
     # Get the body content
-    body = soup.find('body')
-    if not body:
-        body = soup
-
-    # Remove unwanted elements from the body
-    for element in body.find_all('noscript'):
-        element.decompose()
-
-    # Process scripts in body - keep all but make URLs absolute
-    for script in body.find_all('script'):
-        src = script.get('src', '')
-        # Only remove tracking/analytics scripts
-        if 'analytics' in src.lower() or 'tracker' in src.lower() or 'google' in src.lower():
-            script.decompose()
-        # Remove inline tracking scripts
-        elif script.string and ('analytics' in script.string.lower() or 'tracker' in script.string.lower()):
-            script.decompose()
-        # For other scripts, make URLs absolute
-        elif src:
-            if src.startswith('/'):
-                src = f"https://en.wikipedia.org{src}"
-            elif not src.startswith('http'):
-                src = urljoin(source_url, src)
-            script['src'] = src
-
-    # Remove edit links
-    for element in body.find_all('span', {'class': 'mw-editsection'}):
-        element.decompose()
-
-    # Remove certain divs we don't want
-    for element in body.find_all('div', {'class': ['navbox', 'printfooter', 'mw-authority-control', 'noprint']}):
-        element.decompose()
-
-    # Remove site notice / campaign banners (e.g. "Wiki Loves Ramadan")
-    for element in body.find_all('div', {'id': ['siteNotice', 'centralNotice', 'mw-siteNotice']}):
-        element.decompose()
-    for element in body.find_all('div', {'class': lambda c: c and any(x in c for x in ['siteNotice', 'centralNotice'])}):
-        element.decompose()
-
-    # Remove old revision banner ("This is an old revision of this page...")
-    for element in body.find_all('div', {'id': 'contentSub'}):
-        element.decompose()
-
-    # Remove banners, hatnotes, and maintenance boxes
-    for element in body.find_all('div', {'class': lambda c: c and any(x in c for x in ['ambox', 'mbox', 'ombox', 'tmbox', 'cmbox', 'fmbox', 'imbox'])}):
-        element.decompose()
-    for element in body.find_all('div', {'class': 'hatnote'}):
-        element.decompose()
-    for element in body.find_all('div', {'role': 'note'}):
-        element.decompose()
-    for element in body.find_all('table', {'class': lambda c: c and any(x in c for x in ['ambox', 'mbox', 'ombox', 'tmbox', 'cmbox', 'fmbox', 'imbox'])}):
-        element.decompose()
-
-    # Remove language selector/switcher
-    for element in body.find_all('div', {'class': lambda c: c and 'mw-portlet-lang' in c}):
-        element.decompose()
-    for element in body.find_all('button', {'class': lambda c: c and 'mw-interlanguage-selector' in c}):
-        element.decompose()
-    for element in body.find_all('div', {'class': lambda c: c and 'after-portlet-lang' in c}):
-        element.decompose()
-    for element in body.find_all('div', {'id': 'p-lang-btn'}):
-        element.decompose()
-
-    # Replace the footer with a research notice
-    for footer in body.find_all('footer', {'id': 'footer'}):
-        footer.clear()
-        footer['style'] = 'text-align: center; padding: 20px; border-top: 1px solid #ccc; margin-top: 30px; color: #666; font-size: 13px;'
-        footer.append(BeautifulSoup(
-            '<p>This article is created for research purposes only.</p>'
-            '<p>University of Konstanz</p>',
-            'html.parser'
-        ))
-    # Also remove the footer container wrapper styling if present
-    for container in body.find_all('div', {'class': 'mw-footer-container'}):
-        container['style'] = 'background: none; border: none;'
-
-    # Remove "See also" and other navigation boxes
-    for element in body.find_all('div', {'role': 'navigation'}):
-        element.decompose()
-
-    # Remove edit buttons and similar elements
-    for element in body.find_all('span', {'class': 'mw-editsection-bracket'}):
-        element.decompose()
-
-    # Disable all links except internal anchors — keep blue link styling
-    for link in body.find_all('a', href=True):
-        href = link['href']
-        if href.startswith('#'):
-            pass  # Keep anchor links
-        else:
-            link['href'] = 'javascript:void(0)'
+    body = root.find('body')
+    if body is None:
+        body = root
 
-    # Process images
-    for img in body.find_all('img'):
-        if 'src' in img.attrs:
-            src = img['src']
-            if src.startswith('//'):
-                img['src'] = 'https:' + src
-            elif not src.startswith('http'):
-                img['src'] = urljoin(source_url, src)
+    clean_body(body, source_url)
 
     # If offline mode, embed all resources (do this BEFORE converting body to string)
     if offline:
         print("Converting to offline mode...")
-        # Embed images directly in the body BeautifulSoup object
+        # Embed images directly in the parsed body
         embed_images_in_body(body)
         # Embed CSS and fonts in head
-        embed_css_and_fonts_in_head(head, soup)
+        embed_css_and_fonts_in_head(head)
         # Update head_content after embedding
-        head_content = str(head)
+        head_content = etree.tostring(head, encoding='unicode', method='html', with_tail=False)
 
     # Get just the body content (without the body tag itself)
-    body_content = ''.join([str(child) for child in body.children])
+    body_content = inner_html(body)
 
     return {
         'title': title_text,
@@ -305,17 +527,18 @@ def process_wikipedia_html(html_content, source_url, offline=False):
     }
 
 def generate_html(data):
-    """Generate the complete HTML page using Wikipedia's original styling."""
-
-    html = f'''<!DOCTYPE html>
-<html lang="en">
-{data['head_content']}
-<body>
-{data['body_content']}</body>
-</html>
-'''
+    """Generate the complete HTML page using Wikipedia's original styling.
+    Returns a list of UTF-8 encoded chunks to be written out in order,
+    so the (potentially multi-MB) page is never concatenated into one string.
+    """
 
-    return html
+    return [
+        b'<!DOCTYPE html>\n<html lang="en">\n',
+        data['head_content'].encode('utf-8'),
+        b'\n<body>\n',
+        data['body_content'].encode('utf-8'),
+        b'</body>\n</html>\n',
+    ]
 
 def main():
     if len(sys.argv) < 2:
@@ -337,14 +560,11 @@ def main():
     if input_source.startswith('http://') or input_source.startswith('https://'):
         print(f"Fetching: {input_source}")
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(input_source, headers=headers, timeout=10)
+            response = CLIENT.get(input_source, headers=PAGE_HEADERS)
             response.raise_for_status()
             html_content = response.text
             source_url = input_source
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             print(f"✗ Error fetching URL: {e}")
             sys.exit(1)
     else:
@@ -364,14 +584,13 @@ def main():
     data = process_wikipedia_html(html_content, source_url, offline=offline)
 
     print(f"Generating HTML...")
-    html = generate_html(data)
+    chunks = generate_html(data)
 
     print(f"Writing to: {output_file}")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html)
+    with open(output_file, 'wb') as f:
+        f.writelines(chunks)
 
     if offline:
-        import os
         file_size = os.path.getsize(output_file) / (1024 * 1024)
         print(f"✓ Done! Created {output_file} ({file_size:.1f} MB)")
     else:
@@ -39,6 +39,22 @@ class Group(BaseGroup):
     pass
 
 
+# Columns loaded by Player.analysis_columns()
+ANALYSIS_FIELDS = [
+    'group_assignment',
+    'max_scroll_depth',
+    'tab_switches',
+    'link_click_attempts',
+    'reading_time_seconds',
+    'before_q1',
+    'after_q1',
+    'before_q2',
+    'after_q2',
+    'familiarity_change',
+    'confidence_change',
+]
+
+
 class Player(BasePlayer):
     group_assignment = models.IntegerField()
     treatment = models.StringField()
@@ -96,3 +112,17 @@ class Player(BasePlayer):
         ],
         widget=widgets.RadioSelect
     )
+
+    # Before/after deltas, stored once the after questions are submitted
+    familiarity_change = models.IntegerField()  # after_q1 - before_q1
+    confidence_change = models.IntegerField()  # after_q2 - before_q2
+
+    @classmethod
+    def analysis_columns(cls, **filters):
+        """Load ANALYSIS_FIELDS for all matching players in a single query, column-wise
+        (one list per field), e.g. to build a pandas.DataFrame for vectorized analysis.
+        """
+        fields = [getattr(cls, name) for name in ANALYSIS_FIELDS]
+        rows = cls.objects_filter(**filters).with_entities(*fields).all()
+        columns = zip(*rows) if rows else [()] * len(ANALYSIS_FIELDS)
+        return {name: list(values) for name, values in zip(ANALYSIS_FIELDS, columns)}
@@ -30,6 +30,10 @@ class AfterQuestions(Page):
     form_model = Player
     form_fields = ['after_q1', 'after_q2', 'after_q3', 'after_q4', 'after_q5']
 
+    def before_next_page(self):
+        self.player.familiarity_change = self.player.after_q1 - self.player.before_q1
+        self.player.confidence_change = self.player.after_q2 - self.player.before_q2
+
 
 class Results(Page):
     """Thank you page"""